@@ -240,6 +240,13 @@ if __name__ == '__main__':  # pragma:nocover
     except Exception as exc:
         handle_exc(exc, 1)
 
+    # Use the libuv based event loop if installed
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
     loop = asyncio.get_event_loop()
     try:
         loop.run_until_complete(main(args))
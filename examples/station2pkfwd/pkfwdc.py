@@ -37,6 +37,16 @@ from id6 import Id6
 
 logger = logging.getLogger('ts2pktfwd')
 
+# Use orjson if available - encodes straight to the UTF-8 bytes sent in the datagrams
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_encode = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+    def json_encode(obj:Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
 PKFWD_VER = 2
 DFLT_KEEPALIVE_INTVL = 10.0
 DFLT_STAT_INTVL      = 6
@@ -47,6 +57,9 @@ PULL_RESP = 3
 PULL_ACK  = 4
 TX_ACK    = 5    # protocol version 2 only
 
+PKFWD_HDR    = struct.Struct('>BHB')    # version, token, identifier
+PKFWD_GWHDR  = struct.Struct('>BHBq')   # ... followed by gateway EUI
+
 MSGTYPE2NAME = {
     PUSH_DATA : 'PUSH_DATA',
     PUSH_ACK  : 'PUSH_ACK',
@@ -61,7 +74,7 @@ class PkFwdC():
     def __init__(self, pkfwduri:str, routerid:Id6, config:router_config.RouterConfig, on_pull_resp:Any, get_stat:Any) -> None:
         self.host = pkfwduri.hostname
         self.port = pkfwduri.port
-        logger.info('PkFwdC: %s %d' % (self.host, self.port))
+        logger.info('PkFwdC: %s %d', self.host, self.port)
         self.routerid = routerid
         self.rid = routerid.id
         # the id as reported to the remote packet forarder process
@@ -113,9 +126,9 @@ class PkFwdC():
 
     def datagram_received(self, data, addr):
         #logger.info("%s: received packet: %s" % (self, data.hex()))
-        pver, token, t = struct.unpack('>BHB', data[0:4])
+        pver, token, t = PKFWD_HDR.unpack_from(data)
         if pver != PKFWD_VER:
-            logger.info("%s: received invalid packet: %s" % (self, data.hex()))
+            logger.info("%s: received invalid packet: %s", self, data.hex())
         if t == PULL_ACK:
             self.on_pull_ack(token)
             return
@@ -123,19 +136,19 @@ class PkFwdC():
             self.on_push_ack(token)
             return
         if t == PULL_RESP:
-            o = json.loads(data[4:].decode())
-            logger.info("%s: PULL_RESP: token %d, object %s" % (self, token, o))
+            o = json_loads(data[4:])
+            logger.info("%s: PULL_RESP: token %d, object %s", self, token, o)
             self.on_pull_resp(token, o)
             return
-        logger.info("%s: received unknown packet: %s" % (self, data.hex()))
+        logger.info("%s: received unknown packet: %s", self, data.hex())
 
 
     def error_received(self, exc):
-        logger.info("%s: received error: %s" % (self, exc))
+        logger.info("%s: received error: %s", self, exc)
 
 
     def connection_lost(self, exc):
-        logger.error("%s: socket unexpextedly closed" % (self))
+        logger.error("%s: socket unexpextedly closed", self)
 
 
     def sendto(self, message:bytes) -> None:
@@ -164,40 +177,41 @@ class PkFwdC():
                 "data": pdu_b64
             }]
         }
-        logger.info('%s: rxpk: %s' % (self, pkt))
+        logger.info('%s: rxpk: %s', self, pkt)
         self.push_data(pkt)
 
 
     def push_txack(self, token:int) -> None:
-        hdr = struct.pack('>BHBq', PKFWD_VER, token, TX_ACK, self.pkfwdgwid)
-        logger.info('%s: TX_ACK: %d %s' % (self, token, hdr))
+        hdr = PKFWD_GWHDR.pack(PKFWD_VER, token, TX_ACK, self.pkfwdgwid)
+        logger.info('%s: TX_ACK: %d %s', self, token, hdr)
         self.sendto(hdr)
 
 
     def push_data(self, pkt:Any) -> None:
         self.push_data_counter += 1
         self.push_data_token = self.push_data_counter % 65536
-        hdr = struct.pack('>BHBq', PKFWD_VER, self.push_data_token, PUSH_DATA, self.pkfwdgwid)
-        data = hdr + bytes(json.dumps(pkt), 'utf-8')
-        logger.debug('%s: push_data: %s %s' % (self, hdr.hex(), data.hex()))
+        hdr = PKFWD_GWHDR.pack(PKFWD_VER, self.push_data_token, PUSH_DATA, self.pkfwdgwid)
+        data = hdr + json_encode(pkt)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('%s: push_data: %s %s', self, hdr.hex(), data.hex())
         self.sendto(data)
 
 
     def on_push_ack(self, token:int) -> None:
         self.push_ack_counter += 1
-        logger.debug('%s: on_push_ack: %d' % (self, token))
+        logger.debug('%s: on_push_ack: %d', self, token)
 
 
     def pull_data(self) -> None:
         self.pull_data_counter += 1
         self.pull_data_token = self.pull_data_counter % 65536
-        ba = struct.pack('>BHBq', PKFWD_VER, self.pull_data_token, PULL_DATA, self.pkfwdgwid)
+        ba = PKFWD_GWHDR.pack(PKFWD_VER, self.pull_data_token, PULL_DATA, self.pkfwdgwid)
         self.sendto(ba)
 
 
     def on_pull_ack(self, token:int) -> None:
         self.pull_ack_token = token
-        logger.debug('%s: on_pull_ack: %d' % (self, token))
+        logger.debug('%s: on_pull_ack: %d', self, token)
 
 
     async def pull_data_task_func(self) -> None:
@@ -205,7 +219,7 @@ class PkFwdC():
             try:
                 self.pull_data()
             except asyncio.CancelledError:
-                logger.error('%s: pull_data_task_func cancelled.' % (self))
+                logger.error('%s: pull_data_task_func cancelled.', self)
                 raise
             except Exception as exc:
                 logger.error('%s: pull_data_task_func failed: %s', self, exc, exc_info=True)
@@ -219,7 +233,7 @@ class PkFwdC():
                     pkt['stat']['ackr'] = 0.0
                 else:
                     pkt['stat']['ackr'] = round((100*self.push_ack_counter)/self.push_data_counter, 1)
-                logger.info('%s: send_stats: %s' % (self, pkt))
+                logger.info('%s: send_stats: %s', self, pkt)
                 self.push_data(pkt)
 
             await asyncio.sleep(self.keepalive_intvl)
@@ -31,7 +31,7 @@ import logging
 import json
 import struct
 import base64
-import datetime
+import time
 import copy
 from websockets.server import WebSocketServerProtocol as WSSP
 
@@ -43,6 +43,22 @@ from bgtask import BgTask
 
 logger = logging.getLogger('ts2pktfwd')
 
+# Use orjson if available - Station expects JSON in text frames, hence always encode to str.
+try:
+    import orjson
+    json_loads = orjson.loads
+    def json_dumps(obj:Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+
+# Fixed parts of the LoRaWAN PDUs reconstructed from Station's uplink messages
+JREQ_PDU = struct.Struct('<BqqHi')
+UPDF_HDR = struct.Struct('<BiBH')
+UPDF_MIC = struct.Struct('<i')
+
 
 def xtime2bits32(xtime:int) -> int:
     return xtime & 0xFFFFFFFF
@@ -75,6 +91,14 @@ class Router:
         
         self.last_xtime = 0
 
+        # Station msgtype -> handler
+        self.ws_handlers = {
+            'version': self.on_ws_version,
+            'jreq':    self.on_ws_jreq,
+            'updf':    self.on_ws_updf,
+            'dntxed':  self.on_ws_dntxed,
+        }  # type: Dict[str,Callable[[WSSP,Mapping[str,Any]],Awaitable[None]]]
+
     def __str__(self):
         return 'Router:%s' % (self.routerid)
 
@@ -95,7 +119,7 @@ class Router:
         ''' Station has been connected. Loop receiving messages on web socket. '''
         try:
             if self.websocket is not None:
-                logger.error('%s: router already connected, switching to new connection.' % (self))
+                logger.error('%s: router already connected, switching to new connection.', self)
             try:
                 await self.websocket.close()
             except:
@@ -107,67 +131,16 @@ class Router:
             await asyncio.sleep(0.3)
 
             while True:
-                s = json.loads(await websocket.recv())
+                s = json_loads(await websocket.recv())
                 msgtype = s.get('msgtype')
-                logger.info('%s: on_ws: msgtype: %s' % (self, msgtype))
-                logger.debug('%s: on_ws: %s' % (self, s))
-
-                if msgtype == 'version':
-                    logger.info('%s: on_ws: version: %s' % (self, s))
-                    msg = self.config.get_station_config_message()
-                    msg['MuxTime'] = datetime.datetime.utcnow().timestamp()
-                    msg['msgtype'] = 'router_config'
-                    await websocket.send(json.dumps(msg))
-
-                elif msgtype == 'jreq':
-                    self.pkfwdstat['rxnb'] += 1
-                    self.pkfwdstat['rxok'] += 1
-                    self.pkfwdstat['rxfw'] += 1
-
-                    joineui = Eui(s['JoinEui'])
-                    deveui = Eui(s['DevEui'])
-                    devnonce = s['DevNonce']
-                    mic = s['MIC']
-                    mhdr = s['MHdr']
-                    pdu_ba = struct.pack("<BqqHi", mhdr, joineui.as_int(), deveui.as_int(), devnonce & 0xFFFF, mic)
-                    xtime = s['upinfo']['xtime']
-                    self.last_xtime = xtime
-                    rxtime = s['upinfo']['rxtime']
-                    rssi = s['upinfo']['rssi']
-                    snr = s['upinfo']['snr']
-                    datr = self.config.dr2sfbw[s['DR']]
-                    self.pkfwdc.push_rxpk(rxtime, xtime2bits32(xtime), self.chan, self.rfch, s['Freq'], datr, rssi, snr, pdu_ba)
-
-                elif msgtype == 'updf':
-                    self.pkfwdstat['rxnb'] += 1
-                    self.pkfwdstat['rxok'] += 1
-                    self.pkfwdstat['rxfw'] += 1
-
-                    mic = s['MIC']
-                    mhdr = s['MHdr']
-                    devaddr = s['DevAddr']
-                    fctrl = s['FCtrl']
-                    fcnt = s['FCnt']
-                    fopts = bytes.fromhex(s['FOpts'] if s['FOpts'] else '')
-                    fport = bytes.fromhex('%02x' % s['FPort']  if s['FPort'] >= 0 else '')
-                    frmpayload = bytes.fromhex(s['FRMPayload'] if s['FRMPayload'] else '')
-                    pdu_ba = struct.pack("<BiBH{}s{}s{}si".format(len(fopts), len(fport), len(frmpayload)),
-                                         mhdr, devaddr, fctrl & 0xFF, fcnt & 0xFFFF, fopts, fport, frmpayload, mic)
-                    datr = self.config.dr2sfbw[s['DR']]
-                    xtime = s['upinfo']['xtime']
-                    self.last_xtime = xtime
-                    rxtime = s['upinfo']['rxtime']
-                    rssi = s['upinfo']['rssi']
-                    snr = s['upinfo']['snr']
-                    self.pkfwdc.push_rxpk(rxtime, xtime2bits32(xtime), self.chan, self.rfch, s['Freq'], datr, rssi, snr, pdu_ba)
-
-                elif msgtype == 'dntxed':
-                    self.pkfwdstat['txnb'] += 1
-                    token = s['diid']
-                    self.pkfwdc.push_txack(token)
+                logger.info('%s: on_ws: msgtype: %s', self, msgtype)
+                logger.debug('%s: on_ws: %s', self, s)
 
+                handler = self.ws_handlers.get(msgtype)
+                if handler is not None:
+                    await handler(websocket, s)
                 else:
-                    logger.info('%s: on_ws: %s: %s' % (self, msgtype, s))
+                    logger.info('%s: on_ws: %s: %s', self, msgtype, s)
         except Exception as exc:
             logger.error('%s: server socket failed: %s', self, exc, exc_info=True)
         finally:
@@ -175,6 +148,61 @@ class Router:
             await self.pkfwdc.pause()
 
 
+    async def on_ws_version(self, websocket:WSSP, s:Mapping[str,Any]) -> None:
+        logger.info('%s: on_ws: version: %s', self, s)
+        await websocket.send('%s"MuxTime": %s}' % (self.config.get_station_config_json(), json_dumps(time.time())))
+
+
+    async def on_ws_jreq(self, websocket:WSSP, s:Mapping[str,Any]) -> None:
+        self.pkfwdstat['rxnb'] += 1
+        self.pkfwdstat['rxok'] += 1
+        self.pkfwdstat['rxfw'] += 1
+
+        joineui = Eui(s['JoinEui'])
+        deveui = Eui(s['DevEui'])
+        devnonce = s['DevNonce']
+        mic = s['MIC']
+        mhdr = s['MHdr']
+        pdu_ba = JREQ_PDU.pack(mhdr, joineui.as_int(), deveui.as_int(), devnonce & 0xFFFF, mic)
+        xtime = s['upinfo']['xtime']
+        self.last_xtime = xtime
+        rxtime = s['upinfo']['rxtime']
+        rssi = s['upinfo']['rssi']
+        snr = s['upinfo']['snr']
+        datr = self.config.dr2sfbw[s['DR']]
+        self.pkfwdc.push_rxpk(rxtime, xtime2bits32(xtime), self.chan, self.rfch, s['Freq'], datr, rssi, snr, pdu_ba)
+
+
+    async def on_ws_updf(self, websocket:WSSP, s:Mapping[str,Any]) -> None:
+        self.pkfwdstat['rxnb'] += 1
+        self.pkfwdstat['rxok'] += 1
+        self.pkfwdstat['rxfw'] += 1
+
+        mic = s['MIC']
+        mhdr = s['MHdr']
+        devaddr = s['DevAddr']
+        fctrl = s['FCtrl']
+        fcnt = s['FCnt']
+        fopts = bytes.fromhex(s['FOpts'] if s['FOpts'] else '')
+        fport = bytes((s['FPort'],)) if s['FPort'] >= 0 else b''
+        frmpayload = bytes.fromhex(s['FRMPayload'] if s['FRMPayload'] else '')
+        pdu_ba = b''.join((UPDF_HDR.pack(mhdr, devaddr, fctrl & 0xFF, fcnt & 0xFFFF),
+                           fopts, fport, frmpayload, UPDF_MIC.pack(mic)))
+        datr = self.config.dr2sfbw[s['DR']]
+        xtime = s['upinfo']['xtime']
+        self.last_xtime = xtime
+        rxtime = s['upinfo']['rxtime']
+        rssi = s['upinfo']['rssi']
+        snr = s['upinfo']['snr']
+        self.pkfwdc.push_rxpk(rxtime, xtime2bits32(xtime), self.chan, self.rfch, s['Freq'], datr, rssi, snr, pdu_ba)
+
+
+    async def on_ws_dntxed(self, websocket:WSSP, s:Mapping[str,Any]) -> None:
+        self.pkfwdstat['txnb'] += 1
+        token = s['diid']
+        self.pkfwdc.push_txack(token)
+
+
     def get_pkfwd_stat(self) -> MutableMapping[str,Any]:
         return self.pkfwdstat
 
@@ -182,7 +210,7 @@ class Router:
     def on_pull_resp(self, token:int, obj:Any) -> None:
         ''' PULL_RESP from pktfwd socket with downlink for Station. '''
         if 'txpk' not in obj:
-            logger.info('%s: on_pull_resp: unhandled message: %s' % (self, obj))
+            logger.info('%s: on_pull_resp: unhandled message: %s', self, obj)
             return
 
         self.pkfwdstat['dwnb'] += 1
@@ -210,7 +238,7 @@ class Router:
             'pdu':      base64.b64decode(txpk['data'].encode('ascii')).hex(),
             'dnmode':   'updn',
             'diid':     token,
-            'MuxTime':  datetime.datetime.utcnow().timestamp()
+            'MuxTime':  time.time()
         }
         dnmsg['DevEui'] = '58-A0-CB-00-0C-30-33-00'
 
@@ -218,7 +246,7 @@ class Router:
             dnmsg['regionid'] = self.config.get_regionid()
             dnmsg['DevEui'] = '58-A0-CB-00-0C-30-33-00'
 
-        logger.info('%s: on_pull_resp: dnmsg: %s' % (self, dnmsg))
+        logger.info('%s: on_pull_resp: dnmsg: %s', self, dnmsg)
         self.send_ws(dnmsg)
 
 
@@ -231,11 +259,11 @@ class Router:
         ''' Write queued messages out for Station. '''
         try:
             for e in queue:
-                logger.debug('%s: ws_write_bgtask_func: %s' % (self, e))
+                logger.debug('%s: ws_write_bgtask_func: %s', self, e)
                 if self.websocket is not None:
-                    await self.websocket.send(json.dumps(e))
+                    await self.websocket.send(json_dumps(e))
         except asyncio.CancelledError:
-            logger.error('%s: ws_write_bgtask_func cancelled.' % (self))
+            logger.error('%s: ws_write_bgtask_func cancelled.', self)
             raise
         except Exception as exc:
             logger.error('%s: ws_write_bgtask_func failed: %s', self, exc, exc_info=True)
@@ -27,7 +27,7 @@
 from typing import Any,List,Mapping,MutableMapping,Optional
 from pathlib import Path
 import yaml
-import copy
+import json
 import logging
 import pprint
 import struct
@@ -39,6 +39,12 @@ REGION_CONFIG_KEYWORDS = [ 'upchannels', 'DRs' ]
 
 STATION_CONFIG_KEYWORDS = [ 'JoinEui', 'NetID', 'bcning', 'regionid' ]  # and more ..
 
+# RX2 window parameters per region: (RX2DR, RX2Freq)
+REGION_RX2 = {
+    'EU863': (0, 869525000),
+    'US902': (8, 923300000),
+}
+
 class Region:
     def __init__(self, o:Mapping[str,Any]):
         self.name = o['name']
@@ -72,14 +78,9 @@ class RouterConfig:
         self.RxDelay  = 1
 
         region = station['region']
-        if region == 'EU863':
-            self.RX2DR = 0
-            self.RX2Freq = 869525000
-        elif region == 'US902':
-            self.RX2DR = 8
-            self.RX2Freq = 923300000
-        else:
+        if region not in REGION_RX2:
             raise Exception('Unsupported region: %s' % (region))
+        (self.RX2DR, self.RX2Freq) = REGION_RX2[region]
 
         pktfwd = config['pktfwd']
         self.pktfwd = pktfwd
@@ -88,9 +89,18 @@ class RouterConfig:
         else:
             self.pktfwd['gateway_ID'] = struct.unpack('>q', bytes.fromhex(pktfwd['gateway_ID']))[0]
 
+        msg = self.get_station_config_message()
+        msg['msgtype'] = 'router_config'
+        # Encoded once w/o closing brace - MuxTime is appended per connection
+        self.station_config_json = json.dumps(msg)[:-1] + ', '
+
 
     def get_station_config_message(self) -> MutableMapping[str,Any]:
-        return copy.deepcopy(self.station)
+        # Callers only add top-level keys (msgtype, MuxTime) - nested parts are shared, not copied
+        return dict(self.station)
+
+    def get_station_config_json(self) -> str:
+        return self.station_config_json
 
     def get_pktfwd_gateway_ID(self) -> int:
         return self.pktfwd['gateway_ID']
@@ -83,6 +83,8 @@ class Lgw1(LgwHAL):
     IMMEDIATE = 0
     TIMESTAMPED = 1
     ON_GPS = 2
+    PKT_RX_HDR = struct.Struct("@IBBIBBBIBffffHH")
+    PKT_TX_HDR = struct.Struct("@IBIBbBBIBBBHBBH")
 
     @classmethod
     def pack_pkt_rx (cls, pkt:Dict[str,Any], xticks):
@@ -105,8 +107,11 @@ class Lgw1(LgwHAL):
         pkt.get('crc'       ,           0), # CRC that was received in the payload */
         pkt.get('size'      ,      len(p)), # payload size in bytes */
         )
-        data = struct.pack("@IBBIBBBIBffffHH", *f)
-        return data + p + b'\x00' * (cls.SIZE_PKT_RX-cls.OFF_PKT_RX_PAYLOAD-len(p))
+        hdrlen = cls.PKT_RX_HDR.size
+        data = bytearray(hdrlen + max(len(p), cls.SIZE_PKT_RX-cls.OFF_PKT_RX_PAYLOAD))
+        cls.PKT_RX_HDR.pack_into(data, 0, *f)
+        data[hdrlen:hdrlen+len(p)] = p
+        return data
 
     @classmethod
     def unpack_pkt_tx (cls, data):
@@ -128,7 +133,7 @@ class Lgw1(LgwHAL):
         'no_header' , # if true, enable implicit header mode (LoRa), fixed length (FSK) */
         'size'        # payload size in bytes */
         )
-        elems = struct.unpack_from("@IBIBbBBIBBBHBBH", data, 0)
+        elems = cls.PKT_TX_HDR.unpack_from(data, 0)
         pkt = dict(zip(fields, elems))
         pkt['payload'] = data[cls.OFF_PKT_TX_PAYLOAD:cls.OFF_PKT_TX_PAYLOAD+pkt['size']]
         return pkt
@@ -141,6 +146,9 @@ class Lgw2(LgwHAL):
     STAT_CRC_OK = 0x3
     MOD_LORA = 0x1
     MOD_FSK  = 0x2
+    PKT_TX_HDR = struct.Struct("@IIIbBIIIIBHBBBB")
+    PKT_RX_HDR = struct.Struct("@IIIIIIIB")
+    PKT_RX_RSIG = struct.Struct("@BBBBH16sIBBffIfhHHH")
 
     @classmethod
     def pack_pkt_rx (cls, pkt:Dict[str,Any], xticks):
@@ -156,9 +164,12 @@ class Lgw2(LgwHAL):
         pkt.get('coderate'  , cls.CR_LORA_4_5), # error-correcting code of the packet (LoRa only) */
         pkt.get('size'      ,          len(p)), # payload size in bytes */
         )
-        data = struct.pack("@IIIIIIIB", *f)
-        data += p + b'\x00' * (cls.SIZE_PKT_RX-cls.OFF_PKT_RX_PAYLOAD-len(p))
-        data += b'\x00' # Padding
+        # Header, zero padded payload plus one padding byte, then rsig for both RF chains
+        hdrlen = cls.PKT_RX_HDR.size
+        rsigoff = hdrlen + max(len(p), cls.SIZE_PKT_RX-cls.OFF_PKT_RX_PAYLOAD) + 1
+        data = bytearray(rsigoff + 2*cls.PKT_RX_RSIG.size)
+        cls.PKT_RX_HDR.pack_into(data, 0, *f)
+        data[hdrlen:hdrlen+len(p)] = p
 
         #NOT_USED pkt.get('snr_min'   ,         8.7), # minimum packet SNR, in dB (LoRa only) */
         #NOT_USED pkt.get('snr_max'   ,         9.3), # maximum packet SNR, in dB (LoRa only) */
@@ -183,12 +194,9 @@ class Lgw2(LgwHAL):
         0,                                  #  fine_tmst_debug2;  /*!> Fine timestamp debug info 2 */
         0,                                  #  padding
         )
-        rsig = struct.pack("@BBBBH16sIBBffIfhHHH", *f)
-        if pkt.get('rf_chain', 0) == 0:
-            rsig = rsig + bytes(len(rsig))
-        else:
-            rsig = bytes(len(rsig)) + rsig
-        data += rsig
+        if pkt.get('rf_chain', 0) != 0:
+            rsigoff += cls.PKT_RX_RSIG.size
+        cls.PKT_RX_RSIG.pack_into(data, rsigoff, *f)
         return data
 
 
@@ -213,13 +221,15 @@ class Lgw2(LgwHAL):
         'no_header' , # if true, enable implicit header mode (LoRa), fixed length (FSK) */
         'size'        # payload size in bytes */
         )
-        elems = struct.unpack_from("@IIIbBIIIIBHBBBB", data, 0)
+        elems = cls.PKT_TX_HDR.unpack_from(data, 0)
         pkt = dict(zip(fields, elems))
         pkt['payload'] = data[cls.OFF_PKT_TX_PAYLOAD:cls.OFF_PKT_TX_PAYLOAD+pkt['size']]
         return pkt
 
 MAX_CCA_INFOS  = 10  # keep in sync with lgwsim.c
 MAGIC_CCA_FREQ = 0xCCAFCCAF  # ditto
+CCA_HDR  = struct.Struct("@II")
+CCA_INFO = struct.Struct("@IQQ")
 
 class FrmType(object):
     JREQ = 0x00
@@ -232,11 +242,15 @@ class FrmType(object):
     PROP = 0xE0
 
 
+DF_HDR  = struct.Struct('<BiBH')
+DF_PORT = struct.Struct('B')
+DF_MIC  = struct.Struct('<i')
+
 def makeDF(mhdr=FrmType.DAUP, fctrl=0, fcnt=0, devaddr=1, fopts=b'', port=-1, payload=b'', mic=1):
-    b = struct.pack('<BiBH', mhdr, devaddr, fctrl|len(fopts), fcnt) + fopts
+    b = DF_HDR.pack(mhdr, devaddr, fctrl|len(fopts), fcnt) + fopts
     if port >= 0:
-        b += struct.pack('B', port) + payload
-    b += struct.pack('<i', mic)
+        b += DF_PORT.pack(port) + payload
+    b += DF_MIC.pack(mic)
     return b
 
 
@@ -339,8 +353,8 @@ class LgwSim:
     async def send_cca(self, cca_infos:List[Tuple[int,int,int]]):
         assert len(cca_infos) < MAX_CCA_INFOS
         cca_infos = cca_infos + [(0,0,0)] * (MAX_CCA_INFOS - len(cca_infos))
-        p = (struct.pack("@II", MAGIC_CCA_FREQ, 0) +
-             b''.join(struct.pack("@IQQ", int(i[0]*1e6), i[1], i[2])
+        p = (CCA_HDR.pack(MAGIC_CCA_FREQ, 0) +
+             b''.join(CCA_INFO.pack(int(i[0]*1e6), i[1], i[2])
                       for i in cca_infos))
         p += b'\x00' * (self.hal.SIZE_PKT_RX - len(p))
         self.writer.write(p)
@@ -24,9 +24,9 @@
 # OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
 # ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from typing import Any,Dict,List,Optional,Tuple
+from typing import TYPE_CHECKING,Any,Dict,List,Optional,Tuple
 import time
-import re
+import functools
 import base64
 import os
 import sys
@@ -34,159 +34,49 @@ from datetime import datetime
 import struct
 import json
 import asyncio
-import aiohttp
-from aiohttp import web
-import websockets
-import ssl
+from http import HTTPStatus
 from zlib import crc32
 import logging
 from id6 import Id6
-import glob
 
 logger = logging.getLogger('_tcutils')
 
-base_regions = {
-    "EU863" : {
-        'msgtype': 'router_config',
-        'region': 'EU863',
-        'DRs': [(12, 125, 0),
-            (11, 125, 0),
-            (10, 125, 0),
-            (9, 125, 0),
-            (8, 125, 0),
-            (7, 125, 0),
-            (7, 250, 0),
-            (0, 0, 0),
-            (-1, 0, 0),
-            (-1, 0, 0),
-            (-1, 0, 0),
-            (-1, 0, 0),
-            (-1, 0, 0),
-            (-1, 0, 0),
-            (-1, 0, 0),
-            (-1, 0, 0)],
-        'max_eirp': 16.0,
-        'protocol': 1,
-        'freq_range': [863000000, 870000000]
-    },
-    "US902": {
-        'msgtype': 'router_config',
-        'region': 'US902',
-        'DRs': [(10, 125, 0),
-            (9, 125, 0),
-            (8, 125, 0),
-            (7, 125, 0),
-            (8, 500, 0),
-            (-1, 0, 0),
-            (-1, 0, 0),
-            (-1, 0, 0),
-            (12, 500, 1),
-            (11, 500, 1),
-            (10, 500, 1),
-            (9, 500, 1),
-            (8, 500, 1),
-            (7, 500, 1),
-            (-1, 0, 0),
-            (-1, 0, 0)],
-        'max_eirp': 30.0,
-        'protocol': 1,
-        'freq_range': [902000000, 928000000]
-    }
-}
-base_regions["KR920"] = {
-        'msgtype': 'router_config',
-        'region': 'KR920',
-        'DRs': base_regions["EU863"]["DRs"],
-        'max_eirp': 23.0,
-        'protocol': 1,
-        'freq_range': [920900000, 923300000],
-    }
-
-
-router_config_EU863_6ch = {
-    **base_regions['EU863'],
-    'JoinEui': None,
-    'NetID': None,
-    'bcning': None,
-    'config': {},
-    'hwspec': 'sx1301/1',
-    'sx1301_conf': [{'chan_FSK': {'enable': False},
-                     'chan_Lora_std': {'enable': False},
-                     'chan_multiSF_0': {'enable': True, 'if': -375000, 'radio': 0},
-                     'chan_multiSF_1': {'enable': True, 'if': -175000, 'radio': 0},
-                     'chan_multiSF_2': {'enable': True, 'if': 25000, 'radio': 0},
-                     'chan_multiSF_3': {'enable': True, 'if': 375000, 'radio': 0},
-                     'chan_multiSF_4': {'enable': True, 'if': -237500, 'radio': 1},
-                     'chan_multiSF_5': {'enable': True, 'if': 237500, 'radio': 1},
-                     'chan_multiSF_6': {'enable': False},
-                     'chan_multiSF_7': {'enable': False},
-                     'radio_0': {'enable': True, 'freq': 868475000},
-                     'radio_1': {'enable': True, 'freq': 869287500}}],
-    'upchannels': [[868100000, 0, 5],
-                   [868300000, 0, 5],
-                   [868500000, 0, 5],
-                   [868850000, 0, 5],
-                   [869050000, 0, 5],
-                   [869525000, 0, 5]]
-}
-
-router_config_US902_8ch = {
-    **base_regions['US902'],
-    'JoinEui': None,
-    'NetID': None,
-    'bcning': None,
-    'config': {},
-    'hwspec': 'sx1301/1',
-    'sx1301_conf': [{'chan_FSK': {'enable': False},
-                     'chan_Lora_std': {'enable': True, 'if':   300000, 'radio': 0},
-                     'chan_multiSF_0': {'enable': True, 'if': -400000, 'radio': 0},
-                     'chan_multiSF_1': {'enable': True, 'if': -200000, 'radio': 0},
-                     'chan_multiSF_2': {'enable': True, 'if':  0, 'radio': 0},
-                     'chan_multiSF_3': {'enable': True, 'if':  200000, 'radio': 0},
-                     'chan_multiSF_4': {'enable': True, 'if': -200000, 'radio': 1},
-                     'chan_multiSF_5': {'enable': True, 'if':  0, 'radio': 1},
-                     'chan_multiSF_6': {'enable': True, 'if':  200000, 'radio': 1},
-                     'chan_multiSF_7': {'enable': True, 'if':  400000, 'radio': 1},
-                     'radio_0': {'enable': True, 'freq': 902700000},
-                     'radio_1': {'enable': True, 'freq': 903300000}}],
-    'upchannels': [[902300000, 0, 5],
-                   [902500000, 0, 5],
-                   [902700000, 0, 5],
-                   [902900000, 0, 5],
-                   [903100000, 0, 5],
-                   [903300000, 0, 5],
-                   [903500000, 0, 5],
-                   [903700000, 0, 5]]
-}
-
-
-router_config_KR920 = {
-    **base_regions['KR920'],
-    'JoinEui': None,
-    'NetID': None,
-    'bcning': None,
-    'config': {},
-    'hwspec': 'sx1301/1',
-    'sx1301_conf': [{'chan_FSK': {'enable': False},
-                     'chan_Lora_std': {'enable': False},
-                     'chan_multiSF_0': {'enable': True, 'if': -200000, 'radio': 0},
-                     'chan_multiSF_1': {'enable': True, 'if': 0, 'radio': 0},
-                     'chan_multiSF_2': {'enable': True, 'if': 200000, 'radio': 0},
-                     'chan_multiSF_3': {'enable': False},
-                     'chan_multiSF_4': {'enable': False},
-                     'chan_multiSF_5': {'enable': False},
-                     'chan_multiSF_6': {'enable': False},
-                     'chan_multiSF_7': {'enable': False},
-                     'radio_0': {'enable': True, 'freq': 922300000},
-                     'radio_1': {'enable': False, 'freq': 0}}],
-    'upchannels': [(922100000, 0, 5),
-                   (922300000, 0, 5),
-                   (922500000, 0, 5)]
-}
+# Use orjson if available - results are always str since station expects JSON in text frames
+# (binary frames are routed to the remote shell).
+try:
+    import orjson
+    json_loads = orjson.loads
+    def json_dumps(obj:Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+# NOTE: aiohttp, websockets and ssl are imported where used so that consumers
+# of the region/router config tables do not pay for loading them.
+if TYPE_CHECKING:
+    from aiohttp import web
+
+# Region and router config tables live in tcutils_regions
+from tcutils_regions import (base_regions, ROUTER_CONFIGS, REGION_ALIASES, make_router_config, resolve_router_config,
+                             router_config_EU863_6ch, router_config_US902_8ch, router_config_KR920)
+
+# File identity used to validate cached file contents - None if the file does not exist
+def _fstamp(fn:str) -> Optional[Tuple[int,int,int]]:
+    try:
+        st = os.stat(fn)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
 
 GPS_EPOCH=datetime(1980,1,6)
 UPC_EPOCH=datetime(1970,1,1)
 UTC_GPS_LEAPS=18
+GPS_EPOCH_UNIX_US=int((GPS_EPOCH - UPC_EPOCH).total_seconds())*1000000
+
+# Server SSL contexts shared by all servers using the same identity files
+# (tlsidentity, tls_no_ca) -> (stamps of .trust/.crt/.key, context)
+_tlsctx_cache = {}    # type: Dict[Tuple[str,bool],Tuple[List[Any],Any]]
 
 class ServerABC:
     def __init__(self, port:int=6000, tlsidentity:Optional[str]=None, tls_no_ca=False):
@@ -199,17 +89,35 @@ class ServerABC:
     def make_tlsctx(self, tlsidentity:Optional[str]):
         if tlsidentity is None:
             return {}
-        tlsctx = ssl.SSLContext(ssl.PROTOCOL_TLSv1_2)
+        key = (tlsidentity, self.tls_no_ca)
+        # Stamped before loading so that files replaced meanwhile are picked up next time
+        stamps = [_fstamp(tlsidentity+ext) for ext in ('.trust', '.crt', '.key')]
+        ent = _tlsctx_cache.get(key)
+        if ent is not None and ent[0] == stamps:
+            return { 'ssl':ent[1] }
+        import ssl
+        tlsctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        tlsctx.options |= ssl.OP_NO_SSLv3 | ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1    # TLS 1.2 or later
         tlsctx.load_verify_locations(tlsidentity+'.trust')
         crtfile = tlsidentity+'.crt'
         keyfile = tlsidentity+'.key'
         tlsctx.load_cert_chain(crtfile, keyfile)
         if not self.tls_no_ca:
             tlsctx.verify_mode = ssl.CERT_REQUIRED
+        _tlsctx_cache[key] = (stamps, tlsctx)
         return { 'ssl':tlsctx }
 
     async def start_server(self):
-        self.server = await websockets.serve(self.handle_ws, host='0.0.0.0', port=self.port, **self.tlsctx)
+        import websockets
+        server = self
+        class Protocol(websockets.WebSocketServerProtocol):
+            async def process_request(self, path, request_headers):
+                return await server.process_request(path, request_headers)
+        self.server = await websockets.serve(self.handle_ws, host='0.0.0.0', port=self.port, create_protocol=Protocol, **self.tlsctx)
+
+    # Called before the websocket handshake - return (status, headers, body) to reject the request
+    async def process_request(self, path:str, request_headers:Any) -> Optional[Tuple[HTTPStatus,List[Tuple[str,str]],bytes]]:
+        return None
 
     async def handle_ws(self, ws, path):
         pass
@@ -227,11 +135,12 @@ class Infos(ServerABC):
         await super().start_server()
 
     async def handle_ws(self, ws, path):
-        logger.debug('. INFOS connect: %s from %r' % (path, ws.remote_address))
+        import websockets
+        logger.debug('. INFOS connect: %s from %r', path, ws.remote_address)
         try:
-            while True:
-                msg = json.loads(await ws.recv())
-                logger.debug('> INFOS: %r' % msg);
+            async for msgtxt in ws:
+                msg = json_loads(msgtxt)
+                logger.debug('> INFOS: %r', msg)
                 r = msg['router']
                 resp = {
                     'router': r,
@@ -239,8 +148,8 @@ class Infos(ServerABC):
                     'uri'   : self.muxsuri,
                 }
                 resp = self.router_info_response(resp)
-                await ws.send(json.dumps(resp))
-                logger.debug('< INFOS: %r' % resp);
+                await ws.send(json_dumps(resp))
+                logger.debug('< INFOS: %r', resp)
         except websockets.exceptions.ConnectionClosed as exc:
             if exc.code != 1000:
                 logger.error('x INFOS close: code=%d reason=%r', exc.code, exc.reason)
@@ -266,13 +175,17 @@ class Muxs(ServerABC):
         logger.debug("  Starting MUXS (%s/%s) on Port %d" %(self.homedir, self.tlsidentity or "", self.port))
         await super().start_server()
 
-    async def handle_ws(self, ws, path):
-        logger.debug('. MUXS connect: %s' % (path,))
+    async def process_request(self, path:str, request_headers:Any) -> Optional[Tuple[HTTPStatus,List[Tuple[str,str]],bytes]]:
         if path != '/router':
-            await ws.close(1020)
+            logger.debug('x MUXS: rejecting path %s', path)
+            return (HTTPStatus.NOT_FOUND, [], b'')
+        return None
+
+    async def handle_ws(self, ws, path):
+        logger.debug('. MUXS connect: %s', path)
         self.ws = ws
         rconf = self.get_router_config()
-        await ws.send(json.dumps(rconf))
+        await ws.send(json_dumps(rconf))
         logger.debug('< MUXS: router_config.')
         await asyncio.sleep(0.1)           # give station some time to setup radio/timesync
         await self.handle_connection(ws)
@@ -284,21 +197,22 @@ class Muxs(ServerABC):
         pass
 
     async def handle_connection(self, ws):
+        import websockets
         try:
-            while True:
-                msgtxt = await ws.recv()
+            # Iteration returns already queued frames without suspending
+            async for msgtxt in ws:
                 #print('MUXS raw recv: %r' % (msgtxt,))
                 if isinstance(msgtxt, bytes):
                     await self.handle_binaryData(ws, msgtxt)
                     continue
-                msg = json.loads(msgtxt)
+                msg = json_loads(msgtxt)
                 msgtype = msg.get('msgtype')
                 if msgtype:
                     fn = getattr(self, 'handle_'+msgtype, None)
                     if fn:
                         await fn(ws, msg)
                         continue
-                logger.debug('  MUXS: ignored msgtype: %s\n%r' % (msgtype, msg))
+                logger.debug('  MUXS: ignored msgtype: %s\n%r', msgtype, msg)
         except (asyncio.CancelledError, SystemExit):
             raise
         except websockets.exceptions.ConnectionClosed as exc:
@@ -311,20 +225,39 @@ class Muxs(ServerABC):
             except: pass
 
     async def handle_version(self, ws, msg):
-        logger.debug('> MUXS: Station Version: %r' % (msg,))
+        logger.debug('> MUXS: Station Version: %r', msg)
 
     async def handle_timesync(self, ws, msg):
         logger.debug("> MUXS: %r", msg)
         await asyncio.sleep(0.05)
         reply = {
             'msgtype': 'timesync',
-            'gpstime': int(((datetime.utcnow() - GPS_EPOCH).total_seconds() + UTC_GPS_LEAPS)*1e6),
+            'gpstime': int(time.time()*1000000) - GPS_EPOCH_UNIX_US + UTC_GPS_LEAPS*1000000,
             'txtime' : msg['txtime'],
             'MuxTime': time.time(),
         }
         await asyncio.sleep(0.05)
         logger.debug("< MUXS: %r", reply)
-        await ws.send(json.dumps(reply))
+        await ws.send(json_dumps(reply))
+
+
+@functools.lru_cache(maxsize=64)
+def _rdPEM_cached(fn:str, stamp:Tuple[int,int,int], fmt:str) -> bytes:
+    # stamp is only part of the cache key - a modified file yields a new entry
+    with open(fn,'rb') as f:
+        return Cups.normalizePEM(f.read(), fmt)[0]
+
+
+# Signing keys sig*.key in directory home as list of (path, name w/o .key)
+def _sig_keys(home:str) -> List[Tuple[str,str]]:
+    with os.scandir(home) as it:
+        return sorted((e.path, e.name[:-4]) for e in it if e.name.startswith('sig') and e.name.endswith('.key'))
+
+
+# Router ids are static per gateway - parse each distinct id only once
+@functools.lru_cache(maxsize=1024, typed=True)
+def _normalizeId(id:Any) -> str:
+    return str(Id6(id).id)
 
 
 class Cups(ServerABC):
@@ -333,6 +266,8 @@ class Cups(ServerABC):
         self.homedir = homedir
         self.tcdir = tcdir
         self.tlsidentity = tlsidentity
+        self._cfg_cache = {}    # type: Dict[str,Tuple[List[Tuple[str,Any]],Dict[str,Any]]]
+        from aiohttp import web
         self.app = web.Application()
         for args in [ ('POST', '/update-info', self.handle_update_info), ]:
             self.app.router.add_route(*args)
@@ -341,53 +276,161 @@ class Cups(ServerABC):
         logger.debug("  Starting CUPS (%s/%s) on Port %d" %(self.homedir, self.tlsidentity or "", self.port))
         handler = self.app.make_handler()
         self.server = await self.app.loop.create_server(handler, host='0.0.0.0', port=self.port, **self.tlsctx)
+        await self.prebuild()
+
+    # Warm the router config cache for all routers configured in homedir.
+    # File I/O and PEM parsing run in the default executor to keep the event loop responsive.
+    async def prebuild(self) -> None:
+        loop = asyncio.get_event_loop()
+        try:
+            with os.scandir(self.homedir) as it:
+                routerids = [e.name[12:-4] for e in it if e.name.startswith('cups-router-') and e.name.endswith('.cfg')]
+        except OSError:
+            return
+        for routerid in routerids:
+            try:
+                await loop.run_in_executor(None, self.readRouterConfig, routerid)
+            except Exception as ex:
+                logger.debug('  CUPS: Cannot prebuild config for router %s: %s', routerid, ex)
 
 
-    LEND=b'\\s*\r?\n'
-    PEM_REX = re.compile(b'-+BEGIN (?P<key>[^-]+)-+' + LEND +
-                         b'(([0-9A-Za-z+/= ]+' + LEND + b')+)' +
-                         b'-+END (?P=key)-+' + LEND)
+    # Characters allowed on the base64 body lines of a PEM block
+    PEM_B64 = b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz+/= '
 
     # Since router and cups compare CRCs it is crucial that input to the CRC process
     # is excatly the same. Therefore, normalize according the rules below.
     #
     # E.g. resilient again pasting or editing one the files
     # and thereby introducing white space triggered changes the CRC.
-    def normalizePEM(self, data:bytes, fmt="PEM") -> List[bytes]:
+    #
+    # Blocks are located in a single pass over the data: trailing white space is
+    # stripped from every line, blank lines are dropped and the END marker must repeat
+    # the key of the BEGIN marker. Malformed blocks are skipped. A body consisting only
+    # of lines of spaces is accepted and yields an empty body, as with the former regex.
+    @staticmethod
+    def normalizePEM(data:bytes, fmt="PEM") -> List[bytes]:
         norm = []
-        for pem in Cups.PEM_REX.finditer(data):
+        pos = lim = 0
+        while True:
+            b = data.find(b'-BEGIN ', pos)
+            if b < 0:
+                return norm
+            pos = b+1
+            s = b
+            while s > lim and data[s-1] == 0x2D:
+                s -= 1
+            k = b+7
+            e = data.find(b'-', k)
+            if e <= k:
+                continue
+            key = data[k:e]
+            while e < len(data) and data[e] == 0x2D:
+                e += 1
+            nl = data.find(b'\n', e)
+            if nl < 0 or data[e:nl].strip():
+                continue
+            hdr = b'\n'.join([l.rstrip() for l in data[s:e].split(b'\n') if l.strip()])
+            endmark = b'END '+key
+            body = []
+            nbody = 0
+            trailer = None
+            p = nl+1
+            while True:
+                nl = data.find(b'\n', p)
+                if nl < 0:
+                    break
+                line = data[p:nl].rstrip()
+                if not line:
+                    # A line of blanks starting with a space counts as an (empty) body line
+                    if nl > p and data[p] == 0x20:
+                        nbody += 1
+                    p = nl+1
+                    continue
+                p = nl+1
+                if line[0] == 0x2D:
+                    t = line.lstrip(b'-')
+                    if nbody and t.startswith(endmark) and len(t) > len(endmark) and not t[len(endmark):].strip(b'-'):
+                        trailer = line
+                    break
+                if line.translate(None, Cups.PEM_B64):
+                    break
+                body.append(line)
+                nbody += 1
+            if trailer is None:
+                continue
             if fmt == "DER":
-                out = base64.b64decode(re.sub(Cups.LEND, b'\n', pem.group(2)))
+                out = base64.b64decode(b''.join(body))
                 #out += b'\x00' * (4-len(out)&3)
             else:
-                out = re.sub(Cups.LEND, b'\n', pem.group(0))
+                out = b'\n'.join([hdr] + body + [trailer]) + b'\n'
             norm.append(out)
-        return norm
+            pos = lim = p
 
+    # A single stat per call - the file is only opened and parsed if it changed.
     def rdPEM(self, fn, fmt="PEM"):
-        if not os.path.exists(fn):
-            return b'\x00'*4
-        with open(fn,'rb') as f:
-            return self.normalizePEM(f.read(), fmt)[0]
+        stamp = _fstamp(fn)
+        if stamp is not None:
+            try:
+                return _rdPEM_cached(fn, stamp, fmt)
+            except FileNotFoundError:
+                pass    # removed after stat
+        return b'\x00'*4
 
     def normalizeId (self, id:Any) -> str:
         # For tests use a shorter representation
         # For production use str(Id6(id))
-        return str(Id6(id).id)
+        return _normalizeId(id)
 
     def readCupsCred(self, routerid, cupsid, fmt="PEM"):
-        return (self.rdPEM('%s/cups.ca' % cupsid, fmt) +
-                self.rdPEM('%s/cups-router-%s.crt' % (cupsid,routerid), fmt) +
-                self.rdPEM('%s/cups-router-%s.key' % (cupsid,routerid), fmt))
+        return b''.join((self.rdPEM('%s/cups.ca' % cupsid, fmt),
+                         self.rdPEM('%s/cups-router-%s.crt' % (cupsid,routerid), fmt),
+                         self.rdPEM('%s/cups-router-%s.key' % (cupsid,routerid), fmt)))
 
     def readTcCred(self, routerid, fmt="PEM"):
-        return (self.rdPEM('%s/tc.ca' % self.tcdir, fmt) +
-                self.rdPEM('%s/tc-router-%s.crt' % (self.tcdir,routerid), fmt) +
-                self.rdPEM('%s/tc-router-%s.key' % (self.tcdir,routerid), fmt))
+        return b''.join((self.rdPEM('%s/tc.ca' % self.tcdir, fmt),
+                         self.rdPEM('%s/tc-router-%s.crt' % (self.tcdir,routerid), fmt),
+                         self.rdPEM('%s/tc-router-%s.key' % (self.tcdir,routerid), fmt)))
 
+    # Parsed router configs are cached together with the stamps of all files they were built from.
+    # Any change to one of these files (or a new sig*.key in homedir) forces a reload.
     def readRouterConfig(self, id:str) -> Dict[str,Any]:
-        with open('%s/cups-router-%s.cfg' % (self.homedir, id) ) as f:
-            d = json.loads(f.read())
+        ent = self._cfg_cache.get(id)
+        if ent is not None and all(_fstamp(fn) == stamp for fn,stamp in ent[0]):
+            return ent[1]
+        # Stamp the dependencies before reading them and check them again afterwards - a file
+        # rewritten while loading must not end up cached under its new stamp.
+        # homedir and the cfg come first in the dependencies - the others are only known from the cfg.
+        cfgfile = '%s/cups-router-%s.cfg' % (self.homedir, id)
+        stamps = [_fstamp(self.homedir), _fstamp(cfgfile)]
+        with open(cfgfile) as f:
+            d = json_loads(f.read())
+        deps = self.routerConfigDeps(id, d)
+        stamps += [_fstamp(fn) for fn in deps[2:]]
+        d = self.loadRouterConfig(id, d)
+        if all(_fstamp(fn) == stamp for fn,stamp in zip(deps, stamps)):
+            self._cfg_cache[id] = (list(zip(deps, stamps)), d)
+        else:
+            self._cfg_cache.pop(id, None)
+        return d
+
+    # Files (and homedir for new signing keys) a router config is built from
+    def routerConfigDeps(self, id:str, d:Dict[str,Any]) -> List[str]:
+        cupsdir = d.get('cupsId') or self.homedir
+        deps = [self.homedir, '%s/cups-router-%s.cfg' % (self.homedir, id),
+                '%s/cups.ca' % cupsdir, '%s/cups-router-%s.crt' % (cupsdir,id), '%s/cups-router-%s.key' % (cupsdir,id),
+                '%s/tc.ca' % self.tcdir, '%s/tc-router-%s.crt' % (self.tcdir,id), '%s/tc-router-%s.key' % (self.tcdir,id)]
+        version = d.get('version')
+        if version:
+            deps.append(self.homedir+'/'+version+'.bin')
+            for sigkey,signame in _sig_keys(self.homedir):
+                deps += [sigkey, self.homedir+'/'+version+'.bin.'+signame]
+        return deps
+
+    # d is the already parsed cups-router-<id>.cfg - read from homedir if not given
+    def loadRouterConfig(self, id:str, d:Optional[Dict[str,Any]]=None) -> Dict[str,Any]:
+        if d is None:
+            with open('%s/cups-router-%s.cfg' % (self.homedir, id) ) as f:
+                d = json_loads(f.read())
         version = d.get('version', None)
         fwBin = ''
         if version:
@@ -399,47 +442,56 @@ class Cups(ServerABC):
         d['fwBin'] = fwBin
         try:
             d['fwSig'] = []
-            for sigkey in glob.iglob(self.homedir+'/sig*.key', recursive=True):
+            for sigkey,signame in (_sig_keys(self.homedir) if version else ()):
                 try:
                     with open(sigkey,'rb') as f:
                         key = f.read()
                     crc = crc32(key)
-                    logger.debug('  CUPS: Found signing key %s -> CRC %08X' % (sigkey,crc))
-                    sigf = self.homedir+'/'+version+'.bin.'+sigkey.split("/")[1][:-4]
+                    logger.debug('  CUPS: Found signing key %s -> CRC %08X', sigkey, crc)
+                    sigf = self.homedir+'/'+version+'.bin.'+signame
                     with open(sigf, 'rb') as f:
                         fwSig = f.read()
-                    logger.debug('  CUPS: Found signature %s' % sigf)
+                    logger.debug('  CUPS: Found signature %s', sigf)
                     d['fwSig'].append((crc,fwSig))
                 except Exception as ex:
-                    logger.error("x CUPS: Failed reading signin key %s: %s", sigkey, esc, exc_info=True)
+                    logger.error("x CUPS: Failed reading signin key %s: %s", sigkey, ex, exc_info=True)
         except:
             d['fwSig'] = [(b'', b'\x00'*4)]
+        # Signature fields ready to send, indexed by signing key CRC
+        d['fwSigByCrc'] = { c: Cups.U32x2.pack(len(s)+4, c) + s for (c,s) in d['fwSig'] if isinstance(c, int) }
         d['cupsCred'] = self.readCupsCred(id, d.get('cupsId') or self.homedir, d.get("credfmt", "DER"))
         d['tcCred']   = self.readTcCred(id, d.get("credfmt", "DER"))
+        # CRCs are computed once per load and cached with the blobs by readRouterConfig
         d['cupsCredCrc'] = crc32(d['cupsCred']) & 0xFFFFFFFF
         d['tcCredCrc']   = crc32(d['tcCred'])   & 0xFFFFFFFF
         return d
 
+    # Length/CRC prefixes of the update-info response fields
+    U8    = struct.Struct('<B')
+    U16   = struct.Struct('<H')
+    U32   = struct.Struct('<I')
+    U32x2 = struct.Struct('<II')
+
     def encodeUri(self, key:str, req:Dict[str,Any], cfg:Dict[str,Any]) -> bytes:
         k = key+'Uri'
         if not cfg.get(k) or req[k] == cfg[k]:
             return b'\x00'
         s = cfg[k].encode('ascii')
-        return struct.pack('<B', len(s)) + s
+        return Cups.U8.pack(len(s)) + s
 
     def encodeCred(self, key:str, req:Dict[str,Any], cfg:Dict[str,Any]) -> bytes:
         k = key+'CredCrc'
         if not cfg.get(k) or req[k] == cfg[k]:
             return b'\x00\x00'
         d = cfg[key+'Cred']
-        return struct.pack('<H', len(d)) + d
+        return Cups.U16.pack(len(d)) + d
 
     def encodeFw(self, req:Dict[str,Any], cfg:Dict[str,Any]) -> bytes:
         if not cfg.get('version') or req['version'] == cfg['version']:
             logger.debug('  CUPS: No fw update required')
             return b'\x00\x00\x00\x00'
         fwbin = cfg['fwBin']
-        return struct.pack('<I', len(fwbin)) + fwbin
+        return Cups.U32.pack(len(fwbin)) + fwbin
 
     def encodeSig(self, req:Dict[str,Any], cfg:Dict[str,Any]) -> Tuple[bytes, int]:
         if not cfg.get('version') or req['version'] == cfg['version']:
@@ -448,11 +500,13 @@ class Cups(ServerABC):
         if sc is None:
             logger.debug('x CUPS: Request does not contain a signing key CRC!')
             return (b'\x00\x00\x00\x00',0)
-        for (c,s) in cfg['fwSig']:
-            for scn in sc:
-                if c == int(scn):
-                    logger.debug('  CUPS: Found matching signing key with CRC %08X', c)
-                    return (struct.pack('<II', len(s)+4, c) + s, c)
+        sigs = cfg['fwSigByCrc']
+        for scn in sc:
+            c = int(scn)
+            r_sig = sigs.get(c)
+            if r_sig is not None:
+                logger.debug('  CUPS: Found matching signing key with CRC %08X', c)
+                return (r_sig, c)
         logger.debug('x CUPS: Unable to encode matching signature!')
         return (b'\x00'*4,0)
 
@@ -460,16 +514,18 @@ class Cups(ServerABC):
         return r_cupsUri + r_tcUri + r_cupsCred + r_tcCred + r_sig + r_fwbin
 
 
-    async def handle_update_info(self, request) -> web.Response:
-        req = await request.json()
-        logger.debug('> CUPS Request: %r' % req);
+    async def handle_update_info(self, request) -> 'web.Response':
+        from aiohttp import web
+        req = json_loads(await request.read())
+        logger.debug('> CUPS Request: %r', req)
 
         routerid  = self.normalizeId(req['router'])
-        cfg = self.readRouterConfig(routerid)
+        # File and PEM work of a cold config cache runs off the event loop
+        cfg = await asyncio.get_event_loop().run_in_executor(None, self.readRouterConfig, routerid)
 
         version = req.get('package')
         if not version:
-            logger.debug('x CUPS: router %s reported nil/unknown firmware!' % (routerid))
+            logger.debug('x CUPS: router %s reported nil/unknown firmware!', routerid)
             return web.Response(status=404, text='Nil/unknown firmware')
         req['version'] = version
 
@@ -485,21 +541,22 @@ class Cups(ServerABC):
         (r_sig, r_sigCrc) = self.encodeSig(req, cfg)
         r_fwbin           = self.encodeFw(req, cfg)
 
-        logger.debug('< CUPS Response:\n'
-              '  cupsUri : %s %s\n'
-              '  tcUri   : %s %s\n'
-              '  cupsCred: %3d bytes -- %s\n'
-              '  tcCred  : %3d bytes -- %s\n'
-              '  sigCrc  : %08X\n'
-              '  sig     : %3d bytes\n'
-              '  fw      : %3d bytes -- %s'
-              ,  r_cupsUri[1:], ("<- " if r_cupsUri[1:] else "-- ") + "[%s]" % cupsUri,
-                 r_tcUri[1:], ("<- " if r_tcUri[1:] else "-- ") + "[%s]" % tcUri,
-                 len(r_cupsCred)-2, ("[%08X] <- " % cfg['cupsCredCrc'] if len(r_cupsCred)-2 else "") + "[%08X]" % (cupsCrc),
-                 len(r_tcCred)-2  , ("[%08X] <- " % cfg['tcCredCrc'] if len(r_tcCred)-2 else "") + "[%08X]" % (tcCrc),
-                 r_sigCrc,
-                 len(r_sig)-4, # includes CRC
-                 len(r_fwbin)-4, ("[%s] <- " % cfg.get('version') if len(r_fwbin)-4 else "") + "[%s]" % (req['version']))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('< CUPS Response:\n'
+                  '  cupsUri : %s %s\n'
+                  '  tcUri   : %s %s\n'
+                  '  cupsCred: %3d bytes -- %s\n'
+                  '  tcCred  : %3d bytes -- %s\n'
+                  '  sigCrc  : %08X\n'
+                  '  sig     : %3d bytes\n'
+                  '  fw      : %3d bytes -- %s'
+                  ,  r_cupsUri[1:], ("<- " if r_cupsUri[1:] else "-- ") + "[%s]" % cupsUri,
+                     r_tcUri[1:], ("<- " if r_tcUri[1:] else "-- ") + "[%s]" % tcUri,
+                     len(r_cupsCred)-2, ("[%08X] <- " % cfg['cupsCredCrc'] if len(r_cupsCred)-2 else "") + "[%08X]" % (cupsCrc),
+                     len(r_tcCred)-2  , ("[%08X] <- " % cfg['tcCredCrc'] if len(r_tcCred)-2 else "") + "[%08X]" % (tcCrc),
+                     r_sigCrc,
+                     len(r_sig)-4, # includes CRC
+                     len(r_fwbin)-4, ("[%s] <- " % cfg.get('version') if len(r_fwbin)-4 else "") + "[%s]" % (req['version']))
 
         body = self.on_response(r_cupsUri, r_tcUri, r_cupsCred, r_tcCred, r_sig, r_fwbin)
         return web.Response(body=body)
@@ -0,0 +1,196 @@
+# --- Revised 3-Clause BSD License ---
+# Copyright Semtech Corporation 2020. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright notice,
+#       this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright notice,
+#       this list of conditions and the following disclaimer in the documentation
+#       and/or other materials provided with the distribution.
+#     * Neither the name of the Semtech corporation nor the names of its
+#       contributors may be used to endorse or promote products derived from this
+#       software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL SEMTECH CORPORATION. BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF
+# ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from typing import Any,Dict,Optional,Tuple
+from types import MappingProxyType
+import functools
+
+# DR tables as (SF, BW, dnonly) - shared by all regions using the same table
+_DR_EU863 = ((12, 125, 0),
+             (11, 125, 0),
+             (10, 125, 0),
+             (9, 125, 0),
+             (8, 125, 0),
+             (7, 125, 0),
+             (7, 250, 0),
+             (0, 0, 0),
+             (-1, 0, 0),
+             (-1, 0, 0),
+             (-1, 0, 0),
+             (-1, 0, 0),
+             (-1, 0, 0),
+             (-1, 0, 0),
+             (-1, 0, 0),
+             (-1, 0, 0))
+
+_DR_US902 = ((10, 125, 0),
+             (9, 125, 0),
+             (8, 125, 0),
+             (7, 125, 0),
+             (8, 500, 0),
+             (-1, 0, 0),
+             (-1, 0, 0),
+             (-1, 0, 0),
+             (12, 500, 1),
+             (11, 500, 1),
+             (10, 500, 1),
+             (9, 500, 1),
+             (8, 500, 1),
+             (7, 500, 1),
+             (-1, 0, 0),
+             (-1, 0, 0))
+
+# Region templates - read-only, derive router configs via dict(base_regions[X], ...)
+base_regions = {
+    "EU863": MappingProxyType({
+        'msgtype': 'router_config',
+        'region': 'EU863',
+        'DRs': _DR_EU863,
+        'max_eirp': 16.0,
+        'protocol': 1,
+        'freq_range': (863000000, 870000000)
+    }),
+    "US902": MappingProxyType({
+        'msgtype': 'router_config',
+        'region': 'US902',
+        'DRs': _DR_US902,
+        'max_eirp': 30.0,
+        'protocol': 1,
+        'freq_range': (902000000, 928000000)
+    }),
+    "KR920": MappingProxyType({
+        'msgtype': 'router_config',
+        'region': 'KR920',
+        'DRs': _DR_EU863,
+        'max_eirp': 23.0,
+        'protocol': 1,
+        'freq_range': (920900000, 923300000),
+    }),
+}
+
+
+# SX1301 channel plans - shared templates, do not modify in place
+_SX1301_EU863_6CH = {'chan_FSK': {'enable': False},
+                     'chan_Lora_std': {'enable': False},
+                     'chan_multiSF_0': {'enable': True, 'if': -375000, 'radio': 0},
+                     'chan_multiSF_1': {'enable': True, 'if': -175000, 'radio': 0},
+                     'chan_multiSF_2': {'enable': True, 'if': 25000, 'radio': 0},
+                     'chan_multiSF_3': {'enable': True, 'if': 375000, 'radio': 0},
+                     'chan_multiSF_4': {'enable': True, 'if': -237500, 'radio': 1},
+                     'chan_multiSF_5': {'enable': True, 'if': 237500, 'radio': 1},
+                     'chan_multiSF_6': {'enable': False},
+                     'chan_multiSF_7': {'enable': False},
+                     'radio_0': {'enable': True, 'freq': 868475000},
+                     'radio_1': {'enable': True, 'freq': 869287500}}
+
+_SX1301_US902_8CH = {'chan_FSK': {'enable': False},
+                     'chan_Lora_std': {'enable': True, 'if':   300000, 'radio': 0},
+                     'chan_multiSF_0': {'enable': True, 'if': -400000, 'radio': 0},
+                     'chan_multiSF_1': {'enable': True, 'if': -200000, 'radio': 0},
+                     'chan_multiSF_2': {'enable': True, 'if':  0, 'radio': 0},
+                     'chan_multiSF_3': {'enable': True, 'if':  200000, 'radio': 0},
+                     'chan_multiSF_4': {'enable': True, 'if': -200000, 'radio': 1},
+                     'chan_multiSF_5': {'enable': True, 'if':  0, 'radio': 1},
+                     'chan_multiSF_6': {'enable': True, 'if':  200000, 'radio': 1},
+                     'chan_multiSF_7': {'enable': True, 'if':  400000, 'radio': 1},
+                     'radio_0': {'enable': True, 'freq': 902700000},
+                     'radio_1': {'enable': True, 'freq': 903300000}}
+
+_SX1301_KR920_3CH = {'chan_FSK': {'enable': False},
+                     'chan_Lora_std': {'enable': False},
+                     'chan_multiSF_0': {'enable': True, 'if': -200000, 'radio': 0},
+                     'chan_multiSF_1': {'enable': True, 'if': 0, 'radio': 0},
+                     'chan_multiSF_2': {'enable': True, 'if': 200000, 'radio': 0},
+                     'chan_multiSF_3': {'enable': False},
+                     'chan_multiSF_4': {'enable': False},
+                     'chan_multiSF_5': {'enable': False},
+                     'chan_multiSF_6': {'enable': False},
+                     'chan_multiSF_7': {'enable': False},
+                     'radio_0': {'enable': True, 'freq': 922300000},
+                     'radio_1': {'enable': False, 'freq': 0}}
+
+
+# Uplink channels as (freq, min DR, max DR)
+_UPCH_EU863_6CH = ((868100000, 0, 5),
+                   (868300000, 0, 5),
+                   (868500000, 0, 5),
+                   (868850000, 0, 5),
+                   (869050000, 0, 5),
+                   (869525000, 0, 5))
+
+_UPCH_US902_8CH = ((902300000, 0, 5),
+                   (902500000, 0, 5),
+                   (902700000, 0, 5),
+                   (902900000, 0, 5),
+                   (903100000, 0, 5),
+                   (903300000, 0, 5),
+                   (903500000, 0, 5),
+                   (903700000, 0, 5))
+
+_UPCH_KR920_3CH = ((922100000, 0, 5),
+                   (922300000, 0, 5),
+                   (922500000, 0, 5))
+
+
+# Builds a router config from a region template - defaults shared by all canned configs,
+# extra keyword args override/add fields.
+def make_router_config(region:str, sx1301_conf:Dict[str,Any], upchannels:Tuple[Tuple[int,int,int],...], **kwargs:Any) -> Dict[str,Any]:
+    rconf = dict(base_regions[region],
+                 JoinEui=None,
+                 NetID=None,
+                 bcning=None,
+                 config={},
+                 hwspec='sx1301/1',
+                 sx1301_conf=(sx1301_conf,),
+                 upchannels=upchannels)
+    rconf.update(kwargs)
+    return rconf
+
+router_config_EU863_6ch = make_router_config('EU863', _SX1301_EU863_6CH, _UPCH_EU863_6CH)
+router_config_US902_8ch = make_router_config('US902', _SX1301_US902_8CH, _UPCH_US902_8CH)
+router_config_KR920     = make_router_config('KR920', _SX1301_KR920_3CH, _UPCH_KR920_3CH)
+
+# All canned router configs indexed by (region, hwspec, channel plan)
+ROUTER_CONFIGS = {
+    ('EU863', 'sx1301/1', '6ch'): router_config_EU863_6ch,
+    ('US902', 'sx1301/1', '8ch'): router_config_US902_8ch,
+    ('KR920', 'sx1301/1', '3ch'): router_config_KR920,
+}
+
+# LoRaWAN regional parameter names mapped onto the region names used above
+REGION_ALIASES = {
+    'EU868': 'EU863',
+    'US915': 'US902',
+}
+
+@functools.lru_cache(maxsize=None)
+def resolve_router_config(region:str, hwspec:str='sx1301/1', plan:Optional[str]=None) -> Dict[str,Any]:
+    region = REGION_ALIASES.get(region, region)
+    for (r,hw,p),cfg in ROUTER_CONFIGS.items():
+        if r == region and hw == hwspec and (plan is None or p == plan):
+            return cfg
+    raise KeyError('No router config for region=%s hwspec=%s plan=%s' % (region, hwspec, plan))